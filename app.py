@@ -1,13 +1,23 @@
 import streamlit as st
 import google.generativeai as genai
+import google.ai.generativelanguage as glm
 import tempfile
 import os
 import time
-import json
+import re
+import hashlib
+import asyncio
+import threading
+import concurrent.futures
+import copy
+try:
+    import orjson as json_lib # 更快的 JSON 解析；未安装时回退标准库
+except ImportError:
+    import json as json_lib
 from docx import Document
-from docx.shared import Pt, RGBColor, Inches, Cm
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING, WD_TAB_ALIGNMENT
-from docx.oxml.ns import qn
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from xml.sax.saxutils import escape
 import io
 import datetime
 from google.api_core import retry
@@ -15,6 +25,10 @@ from google.api_core import retry
 # --- 🔧 配置项：Logo 文件 ---
 LOGO_PATH = "logo.png" 
 
+# --- 🔧 配置项：Word 报告模板 (含预定义样式) ---
+# 相对 app.py 所在目录解析，不依赖启动时的工作目录
+REPORT_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_template.docx")
+
 # --- 页面配置 ---
 st.set_page_config(
     page_title="Clearstate Insight Assistant",
@@ -91,83 +105,100 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 辅助函数：渲染自定义侧边栏标题 ---
+# 只在 `with st.sidebar:` 内调用；不直接写 st.sidebar，以便在 st.fragment 中使用
 def render_h1(text):
-    st.sidebar.markdown(f"<div class='sidebar-h1'>{text}</div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='sidebar-h1'>{text}</div>", unsafe_allow_html=True)
 
 def render_h2(text):
-    st.sidebar.markdown(f"<div class='sidebar-h2'>{text}</div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='sidebar-h2'>{text}</div>", unsafe_allow_html=True)
 
 # --- Session State ---
 if 'analysis_result' not in st.session_state:
     st.session_state['analysis_result'] = None
 
 # --- 🧹 文本清洗函数 ---
+MARKDOWN_PATTERN = re.compile(r"\*\*|__|###|##")
+
 def clean_text(text):
-    """去除 Markdown 符号，保持文本纯净"""
-    if isinstance(text, str):
-        text = text.replace("**", "").replace("__", "")
-        text = text.replace("##", "").replace("###", "")
-        return text.strip()
-    return text
+    """去除 Markdown 符号，保持文本纯净 (仅接受 str，类型分派由 clean_data 完成)"""
+    return MARKDOWN_PATTERN.sub("", text).strip()
+
+def clean_data(obj):
+    """分析结果返回后一次性递归清洗所有字符串，Word 生成阶段不再重复清洗"""
+    if isinstance(obj, str):
+        return clean_text(obj)
+    if isinstance(obj, list):
+        return [clean_data(x) for x in obj]
+    if isinstance(obj, dict):
+        return {clean_data(k): clean_data(v) for k, v in obj.items()}
+    return obj
 
 # --- Word 格式化辅助函数 ---
-def set_font_style(run, font_size=11, bold=False):
-    run.font.name = 'Times New Roman'
-    run.element.rPr.rFonts.set(qn('w:eastAsia'), '微软雅黑')
-    run.font.size = Pt(font_size)
-    run.font.color.rgb = RGBColor(0, 0, 0)
-    run.bold = bold
-
-def add_styled_paragraph(doc, text, bold=False, size=11, is_bullet=False, indent_level=0, keep_with_next=False):
-    clean_content = clean_text(str(text))
-    p = doc.add_paragraph()
-    p.paragraph_format.line_spacing = 1.0
-    p.paragraph_format.space_before = Pt(3)
-    p.paragraph_format.space_after = Pt(2) 
-    p.alignment = WD_ALIGN_PARAGRAPH.LEFT 
-    
-    if keep_with_next:
-        p.paragraph_format.keep_with_next = True
-
-    # --- 悬挂缩进逻辑 (Strict Hanging Indent) ---
-    if is_bullet:
-        base_indent = 0.25
-        total_indent = base_indent + (indent_level * 0.25)
-        
-        p.paragraph_format.left_indent = Inches(total_indent)
-        p.paragraph_format.first_line_indent = Inches(-base_indent)
-        p.paragraph_format.tab_stops.add_tab_stop(Inches(total_indent), WD_TAB_ALIGNMENT.LEFT)
-        
-        # 添加 Bullet 符号
-        run_bullet = p.add_run("•\t")
-        set_font_style(run_bullet, font_size=size, bold=bold)
-
-        # 智能加粗逻辑：检测冒号
-        if "：" in clean_content:
-            parts = clean_content.split("：", 1)
-            run_key = p.add_run(parts[0] + "：")
-            set_font_style(run_key, font_size=size, bold=True) # 冒号前加粗
-            
-            run_val = p.add_run(parts[1])
-            set_font_style(run_val, font_size=size, bold=False) # 冒号后正常
-            
-        elif ":" in clean_content:
-            parts = clean_content.split(":", 1)
-            run_key = p.add_run(parts[0] + ":")
-            set_font_style(run_key, font_size=size, bold=True) # 冒号前加粗
-            
-            run_val = p.add_run(parts[1])
-            set_font_style(run_val, font_size=size, bold=False) # 冒号后正常
-            
-        else:
-            run = p.add_run(clean_content)
-            set_font_style(run, font_size=size, bold=bold)
-            
-    else:
-        run = p.add_run(clean_content)
-        set_font_style(run, font_size=size, bold=bold)
+# 段落样式 (ReportTitle / ReportHeading1 / ReportHeading2 / ReportMeta / ReportBody / BulletHang)
+# 预先定义在 report_template.docx 中，由 build_report_template.py 生成
+@st.cache_resource(show_spinner=False)
+def get_report_template():
+    """模板只解析一次；每份报告 deepcopy 一份再写入，缓存中的模板本身不被修改"""
+    return Document(REPORT_TEMPLATE_PATH)
+
+def add_styled_paragraph(doc, text, style='ReportBody'):
+    return doc.add_paragraph(str(text), style=style)
+
+# --- 英文报告：去掉模板样式中的东亚字体 (微软雅黑) ---
+def drop_east_asia_fonts(doc):
+    east_asia = qn('w:eastAsia')
+    for rfonts in doc.styles.element.iter(qn('w:rFonts')):
+        rfonts.attrib.pop(east_asia, None)
+
+# --- 正文段落：直接拼接 XML，整份报告只解析一次 ---
+# 换行与 add_paragraph 一致，转为 <w:br/>
+LINE_BREAK_XML = '</w:t><w:br/><w:t xml:space="preserve">'
+
+def run_xml(text, bold=False, tab=False):
+    rpr_xml = '<w:rPr><w:b/></w:rPr>' if bold else ''
+    tab_xml = '<w:tab/>' if tab else ''
+    text_xml = escape(str(text)).replace("\n", LINE_BREAK_XML)
+    return f'<w:r>{rpr_xml}<w:t xml:space="preserve">{text_xml}</w:t>{tab_xml}</w:r>'
+
+def paragraph_xml(style_id, runs):
+    return f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>{"".join(runs)}</w:p>'
+
+def bullet_xml(style_id, point):
+    content = str(point)
+    runs = [run_xml("•", tab=True)]
     
-    return p
+    # 智能加粗逻辑：冒号前加粗，冒号后正常
+    sep = "：" if "：" in content else (":" if ":" in content else None)
+    if sep:
+        key, val = content.split(sep, 1)
+        runs.append(run_xml(key + sep, bold=True))
+        runs.append(run_xml(val))
+    else:
+        runs.append(run_xml(content))
+    return paragraph_xml(style_id, runs)
+
+# 只有这一条时视为该小节无内容
+NOT_MENTIONED = ("未提及", "Not mentioned")
+
+def subsection_xml(heading_id, body_id, bullet_id, title, content):
+    """小节 = H2 标题 + 内容 (列表为 Bullet，其余为正文)；无内容或只有"未提及"时返回空列表"""
+    if not content or (isinstance(content, list) and len(content) == 1 and content[0] in NOT_MENTIONED):
+        return []
+    parts = [paragraph_xml(heading_id, [run_xml(title)])]
+    if isinstance(content, list):
+        parts.extend(bullet_xml(bullet_id, point) for point in content)
+    else:
+        parts.append(paragraph_xml(body_id, [run_xml(content)]))
+    return parts
+
+def append_paragraphs_xml(doc, parts):
+    """拼好的段落 XML 一次 parse_xml，整体插入到 sectPr 之前"""
+    if not parts:
+        return
+    fragment = parse_xml(f'<w:body {nsdecls("w")}>{"".join(parts)}</w:body>')
+    sect_pr = doc.element.body.sectPr
+    for p in list(fragment):
+        sect_pr.addprevious(p)
 
 # --- 🌍 标题映射字典 ---
 SECTION_HEADERS = {
@@ -221,9 +252,18 @@ SECTION_HEADERS = {
     }
 }
 
+# --- 章节顺序 (Word 输出与分段生成共用) ---
+KEY_ORDER = {
+    "commercial": ('company_sales', 'sales_marketing', 'channel_strategy', 'org_structure', 'competition', 'trends'),
+    "clinical": ('clinical_value', 'adoption', 'competition', 'pain_points', 'expectations'),
+    "meeting": ('meeting_context', 'key_discussion', 'conclusions', 'action_items')
+}
+
 # --- Word 生成逻辑 ---
+@st.cache_data(show_spinner=False, max_entries=16)
 def generate_word_report(data, company, product, date, mode, meeting_topic=""):
-    doc = Document()
+    """data 须为 clean_data 清洗后的分析结果 (分析完成时已统一清洗)，此处不再逐段清洗"""
+    doc = copy.deepcopy(get_report_template())
     
     # 语言判断
     lang = data.get('language', 'en')
@@ -231,6 +271,7 @@ def generate_word_report(data, company, product, date, mode, meeting_topic=""):
         lang_code = 'zh'
     else:
         lang_code = 'en'
+        drop_east_asia_fonts(doc)
 
     # 1. 标题与基础信息
     if lang_code == 'zh':
@@ -246,6 +287,7 @@ def generate_word_report(data, company, product, date, mode, meeting_topic=""):
         type_prefix = "类型"
         exec_title = "摘要概览" if mode == 'meeting' else "执行摘要"
         other_title = "其他补充" if mode == 'meeting' else "其他发现"
+        failed_note = "本章节生成失败，内容未包含在报告中，请重新分析。"
     else:
         if mode == 'meeting':
             main_title = meeting_topic if meeting_topic else "Internal Meeting"
@@ -259,101 +301,55 @@ def generate_word_report(data, company, product, date, mode, meeting_topic=""):
         type_prefix = "Type"
         exec_title = "Overview" if mode == 'meeting' else "Executive Summary"
         other_title = "Other Findings"
+        failed_note = "This section failed to generate and its content is missing. Please re-run the analysis."
 
-    p_title = doc.add_paragraph()
-    p_title.alignment = WD_ALIGN_PARAGRAPH.LEFT
-    p_title.paragraph_format.space_after = Pt(12)
-    run_title = p_title.add_run(title_text)
-    set_font_style(run_title, font_size=16, bold=True)
+    add_styled_paragraph(doc, title_text, style='ReportTitle')
     
     # Meta Info
     info_text = f"{date_prefix}: {date} | {type_prefix}: {type_text}"
-    add_styled_paragraph(doc, info_text, size=10.5, bold=False)
+    add_styled_paragraph(doc, info_text, style='ReportMeta')
     doc.add_paragraph("-" * 80)
 
+    # 正文 (2-4) 先收集为段落 XML，最后一次性插入
+    h1, h2, body, bullet = (
+        doc.styles[name].style_id for name in ('ReportHeading1', 'ReportHeading2', 'ReportBody', 'BulletHang')
+    )
+    parts = []
+
     # 2. Executive Summary
     summary = data.get('executive_summary', '')
     if summary:
-        add_styled_paragraph(doc, exec_title, size=14, bold=True, keep_with_next=True)
-        add_styled_paragraph(doc, summary, size=11)
+        parts.append(paragraph_xml(h1, [run_xml(exec_title)]))
+        parts.append(paragraph_xml(body, [run_xml(summary)]))
 
     # 3. Structured Analysis
-    header_map = SECTION_HEADERS.get(mode, {}).get(lang_code, {})
-    structured = data.get('structured_analysis', {})
-    
-    if structured:
-        key_order = []
-        if mode == 'commercial':
-            key_order = ['company_sales', 'sales_marketing', 'channel_strategy', 'org_structure', 'competition', 'trends']
-        elif mode == 'clinical':
-            key_order = ['clinical_value', 'adoption', 'competition', 'pain_points', 'expectations']
-        elif mode == 'meeting':
-            key_order = ['meeting_context', 'key_discussion', 'conclusions', 'action_items']
-
-        for key in key_order:
-            if key in structured:
-                points = structured[key]
-                display_title = header_map.get(key, key.title())
-                
-                # 检查是否有内容或者是否只有"未提及"/"Not mentioned"
-                if points and not (len(points) == 1 and (points[0] == "未提及" or points[0] == "Not mentioned")):
-                    add_styled_paragraph(doc, display_title, size=12, bold=True, keep_with_next=True)
-                    
-                    if isinstance(points, list):
-                        for point in points:
-                            add_styled_paragraph(doc, point, size=11, is_bullet=True, indent_level=0)
-                    else:
-                        add_styled_paragraph(doc, str(points), size=11)
+    header_map = SECTION_HEADERS[mode][lang_code]
+    structured = data.get('structured_analysis') or {}
+    failed_sections = data.get('failed_sections') or []
+    for key in KEY_ORDER[mode]:
+        if key in structured:
+            parts.extend(subsection_xml(h2, body, bullet, header_map.get(key, key.title()), structured[key]))
+        elif key in failed_sections:
+            # 生成失败的章节明确标出，避免与"未提及"混淆
+            parts.extend(subsection_xml(h2, body, bullet, header_map.get(key, key.title()), failed_note))
 
     # 4. Other Findings
     other_dims = data.get('other_dimensions', {})
     if other_dims:
-        add_styled_paragraph(doc, other_title, size=14, bold=True, keep_with_next=True)
+        parts.append(paragraph_xml(h1, [run_xml(other_title)]))
         for k, v in other_dims.items():
-            if isinstance(v, list) and v and not (len(v) == 1 and (v[0] == "未提及" or v[0] == "Not mentioned")):
-                add_styled_paragraph(doc, k, size=12, bold=True, keep_with_next=True)
-                for point in v:
-                    add_styled_paragraph(doc, point, size=11, is_bullet=True)
-            elif not isinstance(v, list) and v:
-                add_styled_paragraph(doc, k, size=12, bold=True, keep_with_next=True)
-                add_styled_paragraph(doc, str(v), size=11)
+            parts.extend(subsection_xml(h2, body, bullet, k, v))
+
+    append_paragraphs_xml(doc, parts)
 
     bio = io.BytesIO()
     doc.save(bio)
-    bio.seek(0)
-    return bio
+    return bio.getvalue()
 
-# --- 核心逻辑类 ---
-class InterviewAnalyzer:
-    def __init__(self, api_key, model_name):
-        self.api_key = api_key
-        self.model_name = model_name
-        try:
-            genai.configure(api_key=self.api_key)
-            # 使用传入的模型名称初始化
-            self.model = genai.GenerativeModel(self.model_name) 
-        except Exception as e:
-            st.error(f"API Error: {e}")
-
-    def process_audio(self, audio_file_path):
-        try:
-            myfile = genai.upload_file(audio_file_path)
-            with st.spinner("🎧 Uploading & Processing Audio... / 正在上传并解析音频..."):
-                while myfile.state.name == "PROCESSING":
-                    time.sleep(2)
-                    myfile = genai.get_file(myfile.name)
-            if myfile.state.name == "FAILED":
-                st.error("Audio processing failed.")
-                return None
-            return myfile
-        except Exception as e:
-            st.error(f"Upload Error: {e}")
-            return None
-
-    def analyze_interview(self, audio_resource, mode):
-        # 框架定义
-        if mode == "commercial":
-            keys_instruction = """
+# --- 🧠 Prompt 定义 (模块加载时一次性拼好三种模式的完整 Prompt) ---
+# 框架 Key 定义
+PROMPT_KEYS = {
+    "commercial": """
             Use these EXACT keys for `structured_analysis`:
             - `company_sales` (for Interviewed Manufacturer's Sales Performance)
             - `sales_marketing` (for Sales & Marketing Strategy)
@@ -361,87 +357,129 @@ class InterviewAnalyzer:
             - `org_structure` (for Organizational Structure & Personnel - Internal Teams)
             - `competition` (for Competition Landscape)
             - `trends` (for Industry Trends)
-            """
-            framework_desc = """
+            """,
+    "clinical": """
+            Use these EXACT keys for `structured_analysis`:
+            - `clinical_value` (for Clinical Value)
+            - `adoption` (for Adoption & Usage)
+            - `competition` (for Competitive Comparison)
+            - `pain_points` (for Unmet Needs)
+            - `expectations` (for Future Expectations)
+            """,
+    "meeting": """
+            Use these EXACT keys for `structured_analysis`:
+            - `meeting_context` (Attendees, Background)
+            - `key_discussion` (Detailed discussion points, arguments made)
+            - `conclusions` (What was agreed or decided)
+            - `action_items` (Follow-ups, To-dos with owners)
+            """,
+}
+
+# 框架说明
+PROMPT_FRAMEWORKS = {
+    "commercial": """
             1. Company Sales Performance: Specific sales volume, revenue, and growth of the INTERVIEWED company. (Capture all numbers).
             2. Sales & Marketing Strategy: Pricing, promotion, bidding, and marketing activities.
             3. Sales Channel Strategy: **DISTRIBUTOR MANAGEMENT ONLY**. Distribution model (agency vs platform), dealer selection, dealer management policies, and channel incentives.
             4. Organizational Structure: **INTERNAL TEAMS**. Headcount, scale, and changes specifically in **Sales Dept, Marketing Dept, and Product Dept**. (e.g., "Sales team has 50 people", "Marketing expanded by 20%").
             5. Competition Landscape: Market shares of competitors, strengths/weaknesses vs competitors.
             6. Industry Trends: Policy impact, macro environment.
-            """
-            
-            # 添加额外维度指导
-            additional_dimensions = """
+            """,
+    "clinical": """
+            1. Clinical Value: Efficacy, safety.
+            2. Adoption & Usage: Procedure volume, indications.
+            3. Competitive Comparison: Brand vs Brand.
+            4. Unmet Needs: Pain points.
+            5. Future Expectations: Next-gen features.
+            """,
+    "meeting": """
+            1. Meeting Context: List attendees and the main purpose of the meeting.
+            2. Key Discussion Points: COMPREHENSIVE summary of all topics discussed. Do not miss details.
+            3. Conclusions & Decisions: Clear list of decisions made.
+            4. Action Items: Specific next steps, who is responsible, and deadlines if mentioned.
+            """,
+}
+
+# 额外维度指导
+PROMPT_ADDITIONAL_DIMENSIONS = {
+    "commercial": """
             Create additional dimensions in `other_dimensions` for ANY important information that doesn't fit the main framework, especially:
             - Rebate mechanisms (返利机制)
             - Promotion methods (推广方式)
             - Sales performance of specific competing products (竞品销售情况)
             - Any other valuable insights that don't clearly fit into the main categories
             
-            Examples of additional dimension keys:
+            Examples of additional dimension topics:
             - "返利与激励机制" (Rebate & Incentive Mechanisms)
             - "市场推广活动" (Marketing Promotion Activities)
             - "竞品销售表现" (Competitor Sales Performance)
             - "渠道管理策略" (Channel Management Strategy)
-            """
-        elif mode == "clinical":
-            # 保持原有部分
-            keys_instruction = """
-            Use these EXACT keys for `structured_analysis`:
-            - `clinical_value` (for Clinical Value)
-            - `adoption` (for Adoption & Usage)
-            - `competition` (for Competitive Comparison)
-            - `pain_points` (for Unmet Needs)
-            - `expectations` (for Future Expectations)
-            """
-            framework_desc = """
-            1. Clinical Value: Efficacy, safety.
-            2. Adoption & Usage: Procedure volume, indications.
-            3. Competitive Comparison: Brand vs Brand.
-            4. Unmet Needs: Pain points.
-            5. Future Expectations: Next-gen features.
-            """
-            
-            # 添加额外维度指导
-            additional_dimensions = """
+            """,
+    "clinical": """
             Create additional dimensions in `other_dimensions` for ANY important information that doesn't fit the main framework, especially:
             - Specific clinical procedures or techniques mentioned
             - Reimbursement information
             - Hospital procurement processes
             - Any other valuable insights that don't clearly fit into the main categories
             
-            Examples of additional dimension keys:
+            Examples of additional dimension topics:
             - "临床操作技术" (Clinical Techniques)
             - "医保报销情况" (Reimbursement Status)
             - "医院采购流程" (Hospital Procurement Process)
-            """
-        else: # meeting
-            # 保持原有部分
-            keys_instruction = """
-            Use these EXACT keys for `structured_analysis`:
-            - `meeting_context` (Attendees, Background)
-            - `key_discussion` (Detailed discussion points, arguments made)
-            - `conclusions` (What was agreed or decided)
-            - `action_items` (Follow-ups, To-dos with owners)
-            """
-            framework_desc = """
-            1. Meeting Context: List attendees and the main purpose of the meeting.
-            2. Key Discussion Points: COMPREHENSIVE summary of all topics discussed. Do not miss details.
-            3. Conclusions & Decisions: Clear list of decisions made.
-            4. Action Items: Specific next steps, who is responsible, and deadlines if mentioned.
-            """
-            
-            # 添加额外维度指导
-            additional_dimensions = """
+            """,
+    "meeting": """
             Create additional dimensions in `other_dimensions` for ANY important information that doesn't fit the main framework, especially:
             - Unresolved issues or disagreements
             - Background information provided during the meeting
             - Relevant context from previous meetings
             - Any other valuable insights that don't clearly fit into the main categories
-            """
+            """,
+}
+
+# 分段并发生成：概览 (语言/摘要/其他维度) 与每个框架章节各发一个请求
+OVERVIEW_TASK = """### THIS REQUEST:
+        Produce ONLY the overview. Each framework section is generated by a separate request, so do NOT output `structured_analysis`.
+        Use `other_dimensions` only for information that does not belong to any framework section.
+
+        ### OUTPUT JSON:
+        {
+            "language": "zh", 
+            "executive_summary": "High-level summary...",
+            "other_dimensions": [
+                {"topic": "Topic", "details": ["Detail"]}
+            ]
+        }
+        """
+
+def build_section_task(key):
+    return f"""### THIS REQUEST:
+        Produce ONLY the `{key}` section of `structured_analysis`. The summary and the other sections are generated by separate requests.
 
-        system_prompt = f"""
+        ### OUTPUT JSON:
+        {{
+            "language": "zh", 
+            "points": ["Point 1", "Point 2"]
+        }}
+        """
+
+# other_dimensions 只由概览请求生成：规则 8 和 ADDITIONAL DIMENSIONS 只放进概览 Prompt
+OTHER_DIMENSIONS_RULE = """
+
+        8.  **🔍 CAPTURE ALL VALUABLE INFORMATION**:
+            - Be vigilant about capturing ALL valuable information, even if it doesn't fit neatly into the main framework.
+            - Use the `other_dimensions` section to create ADDITIONAL categories for important information that doesn't fit elsewhere.
+            - Pay special attention to: rebate mechanisms, promotion methods, competitor sales performance, and other valuable insights."""
+
+def build_system_prompt(mode, task_instruction, with_other_dimensions=False):
+    keys_instruction = PROMPT_KEYS[mode]
+    framework_desc = PROMPT_FRAMEWORKS[mode]
+    other_dimensions_rule = OTHER_DIMENSIONS_RULE if with_other_dimensions else ""
+    additional_dimensions = f"""
+        
+        ### ADDITIONAL DIMENSIONS:
+        {PROMPT_ADDITIONAL_DIMENSIONS[mode]}""" if with_other_dimensions else ""
+
+    return f"""
         You are a **Senior Consultant** at Clearstate.
         Task: Create a rigorous, data-driven report based on the audio.
 
@@ -479,61 +517,500 @@ class InterviewAnalyzer:
             - If a topic is NOT discussed in the audio, DO NOT include it in your analysis.
             - **WRONG**: Writing "没有专门的销售团队，依托于主要渠道进行销售" when sales team structure was never discussed.
             - **RIGHT**: Simply OMIT any section where no relevant information was provided.
-            - For each main category that has NO information in the audio, use: ["未提及"] or ["Not mentioned"] depending on language.
-
-        8.  **🔍 CAPTURE ALL VALUABLE INFORMATION**:
-            - Be vigilant about capturing ALL valuable information, even if it doesn't fit neatly into the main framework.
-            - Use the `other_dimensions` section to create ADDITIONAL categories for important information that doesn't fit elsewhere.
-            - Pay special attention to: rebate mechanisms, promotion methods, competitor sales performance, and other valuable insights.
+            - For each main category that has NO information in the audio, use: ["未提及"] or ["Not mentioned"] depending on language.{other_dimensions_rule}
 
         ### FRAMEWORK KEYS:
         {keys_instruction}
 
         ### FRAMEWORK DETAILS:
-        {framework_desc}
+        {framework_desc}{additional_dimensions}
+
+        {task_instruction}"""
+
+# SYSTEM_PROMPTS[mode] = {"overview": ..., <section_key>: ...}
+SYSTEM_PROMPTS = {
+    mode: {
+        "overview": build_system_prompt(mode, OVERVIEW_TASK, with_other_dimensions=True),
+        **{key: build_system_prompt(mode, build_section_task(key)) for key in KEY_ORDER[mode]}
+    }
+    for mode in PROMPT_KEYS
+}
+
+# --- 结构化输出 (JSON Schema)：模型直接输出合法 JSON，无需剥离代码块标记 ---
+# Schema 不支持任意键的对象，other_dimensions 以 [{topic, details}] 列表输出，解析后再转回字典
+STRING_LIST_SCHEMA = {"type": "array", "items": {"type": "string"}}
+LANGUAGE_SCHEMA = {"type": "string", "enum": ["zh", "en"]}
+
+OVERVIEW_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "language": LANGUAGE_SCHEMA,
+            "executive_summary": {"type": "string"},
+            "other_dimensions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"topic": {"type": "string"}, "details": STRING_LIST_SCHEMA},
+                    "required": ["topic", "details"]
+                }
+            }
+        },
+        "required": ["language", "executive_summary", "other_dimensions"]
+    }
+}
+
+SECTION_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {"language": LANGUAGE_SCHEMA, "points": STRING_LIST_SCHEMA},
+        "required": ["language", "points"]
+    }
+}
+
+# 输出不是合法 JSON 时的修复请求 (只修格式，不重新分析音频)
+JSON_REPAIR_PROMPT = """The text below was meant to be a single JSON object matching the response schema, but it is not valid JSON (for example it is truncated or has a syntax error).
+Return the corrected JSON object only. Keep every value exactly as written; do not add, remove or rephrase content."""
+
+# 同一次分析中同时进行的 Gemini 请求上限
+MAX_CONCURRENT_REQUESTS = 4
+
+# 生成过程中实时预览的字符数
+LIVE_PREVIEW_CHARS = 500
+
+# 实时预览刷新间隔 (秒)：节流界面更新，内容无变化时不重绘
+LIVE_PREVIEW_INTERVAL = 0.2
+
+# 安全过滤设置：模块级常量，所有请求共用同一份
+SAFETY_SETTINGS = (
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+)
+
+# --- Gemini 全局配置 (Key 不变时跳过) ---
+# genai.configure 会清空 SDK 缓存的默认客户端，上传/查询文件的连接随之重建；Key 未变时保留原客户端
+@st.cache_resource(show_spinner=False)
+def get_genai_config_state():
+    return {'api_key': None, 'lock': threading.Lock()}
+
+def configure_genai(api_key):
+    state = get_genai_config_state()
+    with state['lock']:
+        if state['api_key'] != api_key:
+            genai.configure(api_key=api_key)
+            state['api_key'] = api_key
+
+def delete_gemini_files(file_names):
+    """删除已上传到 Gemini 的文件以释放配额；已过期或不存在的文件直接忽略"""
+    for file_name in file_names:
+        try:
+            genai.delete_file(file_name)
+        except Exception:
+            pass
+
+# --- 异步执行 (进程级常驻事件循环) ---
+# grpc.aio 客户端绑定创建时所在的 loop；缓存的模型跨分析复用，必须始终在同一个 loop 上调用
+@st.cache_resource(show_spinner=False)
+def get_event_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coro, on_poll=None, poll_interval=0.5):
+    """在常驻 loop 上执行协程并等待结果；等待期间由脚本线程回调 on_poll 刷新界面"""
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        # 用 wait 判断是否完成，而不是捕获 result(timeout) 的超时：Python 3.11 起
+        # concurrent.futures.TimeoutError 就是内置 TimeoutError，协程自身抛出的超时会被误当成轮询超时
+        while not concurrent.futures.wait([future], timeout=poll_interval).done:
+            if on_poll:
+                on_poll()
+        return future.result()
+    except BaseException:
+        # 用户停止或重跑脚本时一并取消后台请求
+        future.cancel()
+        raise
+
+# --- Gemini 模型缓存 (同一 Key + 模型跨重跑复用，连同其内部连接) ---
+# 模型自带按 api_key 创建的异步客户端：SDK 默认在首次调用时取进程级 genai.configure 的 Key，
+# 而上传期间其他会话可能已改成别的 Key，缓存后会永久绑错
+async def create_async_client(api_key):
+    # grpc.aio 客户端在常驻 loop 上创建，之后也只在该 loop 上使用
+    return glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+
+@st.cache_resource(show_spinner=False)
+def get_model(api_key, model_name):
+    model = genai.GenerativeModel(model_name)
+    # 依赖 google-generativeai 0.8.x 的私有属性 GenerativeModel._async_client：
+    # generate_content_async 仅在其为 None 时才取默认客户端 (版本已在 requirements.txt 中锁定)
+    model._async_client = run_async(create_async_client(api_key))
+    return model
+
+# 查询文件状态时遇到临时错误 (429/5xx) 快速重试，不中断整个上传流程
+FILE_STATUS_RETRY = retry.Retry(
+    predicate=retry.if_transient_error,
+    initial=0.25,
+    maximum=4.0,
+    multiplier=2.0,
+    timeout=600
+)
+
+# --- 核心逻辑类 ---
+class InterviewAnalyzer:
+    def __init__(self, api_key, model_name):
+        self.api_key = api_key
+        self.model_name = model_name
+        try:
+            # configure 是进程级全局设置，每次分析前确认文件上传使用当前用户的 Key
+            configure_genai(self.api_key)
+            # 使用传入的模型名称初始化
+            self.model = get_model(self.api_key, self.model_name)
+        except Exception as e:
+            st.error(f"API Error: {e}")
+
+    async def _process_audio_async(self, audio_file_path):
+        """上传并等待解析完成；SDK 没有异步文件接口，阻塞调用交给线程池，轮询等待不占用线程"""
+        myfile = await asyncio.to_thread(genai.upload_file, audio_file_path)
+        # 指数退避轮询：短音频很快就绪，长音频查询频率有上限
+        delay = 0.25
+        deadline = time.monotonic() + 600
+        while myfile.state.name == "PROCESSING":
+            if time.monotonic() > deadline:
+                # 超时的文件不会进入会话缓存，Reset 无法回收，这里直接删除
+                await asyncio.to_thread(delete_gemini_files, [myfile.name])
+                raise TimeoutError("Audio processing timed out. / 音频解析超时。")
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.6, 5.0)
+            myfile = await asyncio.to_thread(FILE_STATUS_RETRY(genai.get_file), myfile.name)
+        return myfile
+
+    def process_audio(self, audio_file_path):
+        try:
+            with st.spinner("🎧 Uploading & Processing Audio... / 正在上传并解析音频..."):
+                myfile = run_async(self._process_audio_async(audio_file_path))
+        except TimeoutError as e:
+            st.error(str(e))
+            return None
+        except Exception as e:
+            st.error(f"Upload Error: {e}")
+            return None
+        if myfile.state.name != "ACTIVE":
+            # 只有 ACTIVE 的文件会进入会话缓存，解析失败的文件立即删除
+            delete_gemini_files([myfile.name])
+            st.error("Audio processing failed.")
+            return None
+        return myfile
+
+    def get_active_file(self, file_name):
+        """之前上传的文件仍为 ACTIVE 则直接复用；已过期或被删除时返回 None"""
+        try:
+            myfile = genai.get_file(file_name)
+        except Exception:
+            return None
+        return myfile if myfile.state.name == "ACTIVE" else None
+
+    async def _stream_part(self, name, audio_resource, prompt, generation_config, progress):
+        response = await self.model.generate_content_async(
+            [audio_resource, prompt],
+            stream=True,
+            generation_config=generation_config,
+            safety_settings=SAFETY_SETTINGS,
+            request_options={"timeout": 600}
+        )
+        # 每个部分各自维护最近一段文字用于实时预览，JSON 仅在流结束后解析一次
+        # 已接收字数按部分记录、每次尝试从 0 开始：重试重新生成时不重复计入失败那次的字数
+        tail = ""
+        progress['received'][name] = 0
+        async for chunk in response:
+            chunk_text = "".join(part.text for part in chunk.parts)
+            progress['received'][name] += len(chunk_text)
+            tail = (tail + chunk_text)[-LIVE_PREVIEW_CHARS:]
+            progress['previews'][name] = tail
+        return response.text
+
+    async def _analyze_part(self, name, audio_resource, prompt, generation_config, semaphore, progress, retry_policy):
+        async with semaphore:
+            try:
+                # 重试包住整个流式请求：流式错误 (429/5xx) 在读取首个分块时才抛出
+                text = await retry_policy(self._stream_part)(name, audio_resource, prompt, generation_config, progress)
+            finally:
+                progress['done'] += 1
+                progress['previews'].pop(name, None)
         
-        ### ADDITIONAL DIMENSIONS:
-        {additional_dimensions}
+        try:
+            return json_lib.loads(text.encode())
+        except ValueError:
+            # 偶发的非法 JSON 只请求一次修复 (不带音频，很快)，避免整段重新分析
+            progress['repairs'] += 1
+            return await retry_policy(self._repair_json)(text, generation_config)
 
-        ### OUTPUT JSON:
-        {{
-            "language": "zh", 
-            "executive_summary": "High-level summary...",
-            "structured_analysis": {{
-                "key_1": ["Point 1", "Point 2"]
-            }},
-            "other_dimensions": {{
-                "Topic": ["Detail"]
-            }}
-        }}
-        """
+    async def _repair_json(self, text, generation_config):
+        response = await self.model.generate_content_async(
+            [JSON_REPAIR_PROMPT, text],
+            generation_config=generation_config,
+            safety_settings=SAFETY_SETTINGS,
+            request_options={"timeout": 600}
+        )
+        return json_lib.loads(response.text.encode())
+
+    async def _analyze_parts(self, audio_resource, prompts, progress):
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
         
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-        ]
+        def count_retry(error):
+            progress['retries'] += 1
         
-        try:
-            response = self.model.generate_content(
-                [audio_resource, system_prompt],
-                safety_settings=safety_settings,
-                request_options={"timeout": 600}
-            )
-            
-            try:
-                text = response.text
-                if "```json" in text:
-                    text = text.replace("```json", "").replace("```", "")
-                return json.loads(text.strip())
-            except ValueError:
-                st.error("Error: Model output was not valid JSON.")
-                return None
+        # Gemini 偶发的 429/5xx 指数退避重试，避免长音频分析因一次抖动整体失败
+        retry_policy = retry.AsyncRetry(
+            predicate=retry.if_transient_error,
+            initial=2.0,
+            maximum=60.0,
+            multiplier=2.0,
+            timeout=900,
+            on_error=count_retry
+        )
+        results = await asyncio.gather(
+            *[
+                self._analyze_part(
+                    name,
+                    audio_resource,
+                    prompt,
+                    OVERVIEW_GENERATION_CONFIG if name == "overview" else SECTION_GENERATION_CONFIG,
+                    semaphore,
+                    progress,
+                    retry_policy
+                )
+                for name, prompt in prompts.items()
+            ],
+            return_exceptions=True
+        )
+        return dict(zip(prompts, results))
 
+    def analyze_interview(self, audio_resource, mode):
+        # 概览与各章节并发生成 (同一音频文件，只有 Prompt 不同)，完成后合并为完整报告
+        prompts = SYSTEM_PROMPTS[mode]
+        progress = {'done': 0, 'received': {}, 'retries': 0, 'repairs': 0, 'previews': {}}
+        placeholder = st.empty()
+        last_drawn = None
+        
+        def show_progress():
+            nonlocal last_drawn
+            done, received = progress['done'], sum(list(progress['received'].values()))
+            snapshot = (done, received, progress['retries'], progress['repairs'])
+            if snapshot == last_drawn:
+                return
+            last_drawn = snapshot
+            with placeholder.container():
+                st.write(f"Generating... {done}/{len(prompts)} parts done, {received} characters received / 正在生成... 已完成 {done}/{len(prompts)} 部分，已接收 {received} 字")
+                if progress['retries']:
+                    st.write(f"Transient API errors, retried {progress['retries']} time(s) / 接口临时错误，已重试 {progress['retries']} 次")
+                if progress['repairs']:
+                    st.write(f"Invalid JSON in {progress['repairs']} part(s), repairing / {progress['repairs']} 部分输出格式有误，正在修复")
+                # 并发的多个流只预览最早开始、仍在生成的一个，完成后切换到下一个
+                preview = next(iter(list(progress['previews'].values())), "")
+                if preview:
+                    st.text(preview)
+        
+        try:
+            results = run_async(self._analyze_parts(audio_resource, prompts, progress), on_poll=show_progress, poll_interval=LIVE_PREVIEW_INTERVAL)
         except Exception as e:
             st.error(f"Analysis Interrupted: {e}")
             return None
+        finally:
+            placeholder.empty()
+        
+        overview = results.pop("overview")
+        if isinstance(overview, ValueError):
+            st.error("Error: Model output was not valid JSON.")
+            return None
+        if isinstance(overview, Exception):
+            st.error(f"Analysis Interrupted: {overview}")
+            return None
+        overview['other_dimensions'] = {
+            dim['topic']: dim['details'] for dim in overview.get('other_dimensions', [])
+        }
+        
+        # 单个章节失败不影响整份报告；失败的章节记录在结果中，由结果区和报告标出
+        structured = {}
+        failed_sections = []
+        for key, section in results.items():
+            if isinstance(section, Exception):
+                failed_sections.append(key)
+                continue
+            structured[key] = section.get('points', [])
+        overview['structured_analysis'] = structured
+        overview['failed_sections'] = failed_sections
+        return overview
+
+# --- 侧边栏分组 (st.fragment: 组内控件变化只重跑本组，不重绘整个侧边栏) ---
+def value_changed(name, value):
+    """记录 fragment 内影响主页面的取值，返回是否与上次记录不同 (由调用方决定是否整页重跑)"""
+    state_key = f'last_{name}'
+    changed = st.session_state.get(state_key, value) != value
+    st.session_state[state_key] = value
+    return changed
+
+@st.fragment
+def sidebar_project_info():
+    # --- 项目信息 (Level 1) ---
+    render_h1("Project Info / 项目信息")
+    
+    # Company (Level 2)
+    render_h2("Company / 公司名称")
+    company_name = st.text_input("Company", placeholder="e.g. Medtronic", label_visibility="collapsed")
+    
+    # Product (Level 2)
+    render_h2("Product / 产品领域")
+    product_name = st.text_input("Product", placeholder="e.g. Stapler", label_visibility="collapsed")
+    
+    # Date (Level 2)
+    render_h2("Date / 访谈日期")
+    interview_date = st.date_input("Date", datetime.date.today(), label_visibility="collapsed")
+    
+    # 公司/产品是否填写决定主页面是否显示分析按钮；已有结果时元信息变化需刷新报告
+    has_result = st.session_state['analysis_result'] is not None
+    # 两项都先记录再决定是否重跑：同一次编辑只整页重跑一次
+    complete_changed = value_changed('project_info_complete', bool(company_name and product_name))
+    info_changed = value_changed('project_info', (company_name, product_name, interview_date))
+    if complete_changed or (info_changed and has_result):
+        st.rerun()
+    
+    return company_name, product_name, interview_date
+
+@st.fragment
+def sidebar_interviewee_type():
+    # --- 访谈对象 (Level 1) ---
+    render_h1("Interviewee Type / 访谈对象")
+    
+    # Select Type (Level 2)
+    render_h2("Select Type / 选择类型")
+    interview_sub_type = st.radio(
+        "Select Type", # Hidden Label
+        ("commercial", "clinical"),
+        format_func=lambda x: "Trade (商业/厂商)" if x == "commercial" else "Clinical (临床/专家)",
+        label_visibility="collapsed"
+    )
+    
+    # 访谈类型决定分析使用的 Prompt 和报告结构，变化时总是整页重跑
+    if value_changed('interviewee_type', interview_sub_type):
+        st.rerun()
+    return interview_sub_type
+
+@st.fragment
+def sidebar_meeting_info():
+    # --- 会议信息 (Level 1) ---
+    render_h1("Meeting Info / 会议信息")
+    
+    # Topic (Level 2)
+    render_h2("Topic / 会议主题")
+    meeting_topic = st.text_input("Topic", placeholder="e.g. Weekly Sync", label_visibility="collapsed")
+    
+    # Date (Level 2)
+    render_h2("Date / 会议日期")
+    interview_date = st.date_input("Date", datetime.date.today(), label_visibility="collapsed")
+    
+    has_result = st.session_state['analysis_result'] is not None
+    if value_changed('meeting_info', (meeting_topic, interview_date)) and has_result:
+        st.rerun()
+    return meeting_topic, interview_date
+
+# --- 结果区 (st.fragment: 下载等交互只重跑结果区) ---
+@st.fragment
+def render_result(res, file_name, company, product, date, mode, meeting_topic):
+    st.success("Analysis Complete. Please download the report. / 分析完成，请下载报告。")
+    
+    failed_sections = res.get('failed_sections')
+    if failed_sections:
+        names = ", ".join(SECTION_HEADERS[mode]['en'].get(key, key) for key in failed_sections)
+        st.warning(f"These sections failed to generate and are marked in the report: {names}. Reset and re-run to fill them in. / 以下章节生成失败，已在报告中标注，可重置后重新分析: {names}")
+    
+    # generate_word_report 由 st.cache_data 缓存，内容与元信息不变时重跑不会重建文档
+    docx_bytes = generate_word_report(res, company, product, date, mode, meeting_topic)
+    
+    st.download_button(
+        label=f"Download Word Report / 下载 Word 报告",
+        data=docx_bytes,
+        file_name=file_name,
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        type="primary"
+    )
+
+    st.markdown("---")
+    st.markdown("### Preview / 预览")
+    # 纯文本渲染，跳过前端 Markdown 解析；长摘要默认折叠
+    summary = res.get('executive_summary') or ''
+    if len(summary) > 1000:
+        with st.expander("Executive Summary / 执行摘要", expanded=False):
+            st.text(summary)
+    else:
+        st.text(summary)
+
+# --- 上传与分析区 (st.fragment: 上传文件、点击开始只重跑本区，不重跑侧边栏) ---
+# 参数来自最近一次整页运行；会影响分析的侧边栏取值变化时都会触发整页重跑，参数不会过期
+@st.fragment
+def analysis_section(api_key, selected_model, task_mode, company_name, product_name, interview_mode):
+    uploaded_file = st.file_uploader("Upload Audio / 上传录音 (MP3/M4A Recommended)", type=['mp3', 'wav', 'm4a'])
+
+    if uploaded_file and st.session_state['analysis_result'] is None:
+        if not api_key:
+            st.error("Please enter API Key in the sidebar. / 请在侧边栏输入 API Key。")
+        else:
+            valid_input = True
+            if task_mode == "interview":
+                if not company_name or not product_name:
+                    st.warning("Please fill in Company & Product info. / 请填写公司和产品信息。")
+                    valid_input = False
+        
+            if valid_input:
+                st.audio(uploaded_file, format='audio/mp3')
+            
+                if st.button("Start Analysis / 开始分析", type="primary"):
+                    # 🔴 修改：传入选定的模型名称
+                    analyzer = InterviewAnalyzer(api_key, selected_model)
+                
+                    # 同一音频已上传过则直接复用 Gemini 文件 (按文件名/大小/内容哈希)
+                    # 哈希与写临时文件都直接读取上传缓冲区 (memoryview)，不额外复制整段音频
+                    with uploaded_file.getbuffer() as audio_view:
+                        audio_key = (uploaded_file.name, uploaded_file.size, hashlib.sha256(audio_view).hexdigest())
+                    audio_cache = st.session_state.setdefault('audio_resources', {})
+
+                    with st.status("AI is processing... / AI 正在处理...", expanded=True) as status:
+                        audio_resource = None
+                        if audio_key in audio_cache:
+                            audio_resource = analyzer.get_active_file(audio_cache[audio_key])
+                    
+                        if audio_resource is None:
+                            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
+                                with uploaded_file.getbuffer() as audio_view:
+                                    tmp_file.write(audio_view)
+                                tmp_file_path = tmp_file.name
+                        
+                            st.write("Uploading audio to Gemini... / 正在上传音频...")
+                            try:
+                                audio_resource = analyzer.process_audio(tmp_file_path)
+                            finally:
+                                # 临时文件只用于上传：无论上传成功、失败还是被中断都立即删除
+                                try:
+                                    os.remove(tmp_file_path)
+                                except OSError:
+                                    pass
+                            if audio_resource:
+                                # 会话内只保留当前录音的 Gemini 文件，之前录音的文件随即删除
+                                delete_gemini_files(audio_cache.values())
+                                audio_cache.clear()
+                                audio_cache[audio_key] = audio_resource.name
+                    
+                        if audio_resource:
+                            st.write(f"Analyzing with {selected_model}... / 正在使用 {selected_model} 分析...")
+                            result = analyzer.analyze_interview(audio_resource, interview_mode)
+                        
+                            if result:
+                                st.session_state['analysis_result'] = clean_data(result)
+                                status.update(label="Done! / 完成！", state="complete", expanded=False)
+                                st.rerun()
 
 # --- UI 主程序 ---
 with st.sidebar:
@@ -561,6 +1038,7 @@ with st.sidebar:
     )
     
     # --- 任务模式 (Level 1) ---
+    # 切换模式会改变侧边栏分组和主页面布局，因此不放入 fragment
     render_h1("Task Mode / 任务模式")
     
     # Select Mode (Level 2)
@@ -579,97 +1057,29 @@ with st.sidebar:
     interview_mode = "meeting" 
     
     if task_mode == "interview":
-        # --- 项目信息 (Level 1) ---
-        render_h1("Project Info / 项目信息")
-        
-        # Company (Level 2)
-        render_h2("Company / 公司名称")
-        company_name = st.text_input("Company", placeholder="e.g. Medtronic", label_visibility="collapsed")
-        
-        # Product (Level 2)
-        render_h2("Product / 产品领域")
-        product_name = st.text_input("Product", placeholder="e.g. Stapler", label_visibility="collapsed")
-        
-        # Date (Level 2)
-        render_h2("Date / 访谈日期")
-        interview_date = st.date_input("Date", datetime.date.today(), label_visibility="collapsed")
-        
-        # --- 访谈对象 (Level 1) ---
-        render_h1("Interviewee Type / 访谈对象")
-        
-        # Select Type (Level 2)
-        render_h2("Select Type / 选择类型")
-        interview_sub_type = st.radio(
-            "Select Type", # Hidden Label
-            ("commercial", "clinical"),
-            format_func=lambda x: "Trade (商业/厂商)" if x == "commercial" else "Clinical (临床/专家)",
-            label_visibility="collapsed"
-        )
-        interview_mode = interview_sub_type
+        company_name, product_name, interview_date = sidebar_project_info()
+        interview_mode = sidebar_interviewee_type()
         
     else: # Meeting Mode
-        # --- 会议信息 (Level 1) ---
-        render_h1("Meeting Info / 会议信息")
-        
-        # Topic (Level 2)
-        render_h2("Topic / 会议主题")
-        meeting_topic = st.text_input("Topic", placeholder="e.g. Weekly Sync", label_visibility="collapsed")
-        
-        # Date (Level 2)
-        render_h2("Date / 会议日期")
-        interview_date = st.date_input("Date", datetime.date.today(), label_visibility="collapsed")
+        meeting_topic, interview_date = sidebar_meeting_info()
         interview_mode = "meeting"
 
     st.markdown("<br>", unsafe_allow_html=True) # Spacer
     if st.button("Reset / 重置"):
         st.session_state['analysis_result'] = None
+        # 删除本次会话上传到 Gemini 的音频，释放配额
+        audio_cache = st.session_state.pop('audio_resources', {})
+        if audio_cache and api_key:
+            configure_genai(api_key)
+            delete_gemini_files(audio_cache.values())
         st.rerun()
 
 st.markdown('<div class="main-header">智能市场洞察辅助工具</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Intelligent Market Insight Assistant</div>', unsafe_allow_html=True)
 
-uploaded_file = st.file_uploader("Upload Audio / 上传录音 (MP3/M4A Recommended)", type=['mp3', 'wav', 'm4a'])
-
-if uploaded_file and st.session_state['analysis_result'] is None:
-    if not api_key:
-        st.error("Please enter API Key in the sidebar. / 请在侧边栏输入 API Key。")
-    else:
-        valid_input = True
-        if task_mode == "interview":
-            if not company_name or not product_name:
-                st.warning("Please fill in Company & Product info. / 请填写公司和产品信息。")
-                valid_input = False
-        
-        if valid_input:
-            st.audio(uploaded_file, format='audio/mp3')
-            
-            if st.button("Start Analysis / 开始分析", type="primary"):
-                # 🔴 修改：传入选定的模型名称
-                analyzer = InterviewAnalyzer(api_key, selected_model)
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    tmp_file_path = tmp_file.name
-
-                with st.status("AI is processing... / AI 正在处理...", expanded=True) as status:
-                    st.write("Uploading audio to Gemini... / 正在上传音频...")
-                    audio_resource = analyzer.process_audio(tmp_file_path)
-                    
-                    if audio_resource:
-                        st.write(f"Analyzing with {selected_model}... / 正在使用 {selected_model} 分析...")
-                        result = analyzer.analyze_interview(audio_resource, interview_mode)
-                        
-                        if result:
-                            st.session_state['analysis_result'] = result
-                            status.update(label="Done! / 完成！", state="complete", expanded=False)
-                            os.remove(tmp_file_path)
-                            st.rerun()
+analysis_section(api_key, selected_model, task_mode, company_name, product_name, interview_mode)
 
 if st.session_state['analysis_result']:
-    res = st.session_state['analysis_result']
-    
-    st.success("Analysis Complete. Please download the report. / 分析完成，请下载报告。")
-    
     file_date_str = interview_date.strftime("%Y%m%d")
     
     if task_mode == "interview":
@@ -678,16 +1088,4 @@ if st.session_state['analysis_result']:
         topic_str = meeting_topic if meeting_topic else "Meeting"
         file_name = f"Minutes_{topic_str}_{file_date_str}.docx"
     
-    docx_file = generate_word_report(res, company_name, product_name, interview_date, interview_mode, meeting_topic)
-    
-    st.download_button(
-        label=f"Download Word Report / 下载 Word 报告",
-        data=docx_file,
-        file_name=file_name,
-        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        type="primary"
-    )
-
-    st.markdown("---")
-    st.markdown("### Preview / 预览")
-    st.write(res.get('executive_summary'))
+    render_result(st.session_state['analysis_result'], file_name, company_name, product_name, interview_date, interview_mode, meeting_topic)
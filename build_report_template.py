@@ -0,0 +1,56 @@
+"""生成 report_template.docx：报告用到的段落样式都预先定义在模板里，app.py 运行时只引用样式名"""
+import os
+from docx import Document
+from docx.shared import Pt, RGBColor, Inches
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_TAB_ALIGNMENT
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_template.docx")
+
+# --- 段落样式 ---
+# 样式名: (字号, 加粗, 与下段同页)
+REPORT_STYLES = {
+    'ReportTitle': (16, True, False),
+    'ReportHeading1': (14, True, True),
+    'ReportHeading2': (12, True, True),
+    'ReportMeta': (10.5, False, False),
+    'ReportBody': (11, False, False),
+    'BulletHang': (11, False, False),
+}
+
+def add_report_styles(doc):
+    for name, (size, bold, keep_with_next) in REPORT_STYLES.items():
+        style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = doc.styles['Normal']
+        style.font.name = 'Times New Roman'
+        style.element.rPr.rFonts.set(qn('w:eastAsia'), '微软雅黑')
+        style.font.size = Pt(size)
+        style.font.color.rgb = RGBColor(0, 0, 0)
+        style.font.bold = bold
+        
+        fmt = style.paragraph_format
+        fmt.line_spacing = 1.0
+        fmt.space_before = Pt(3)
+        fmt.space_after = Pt(2)
+        fmt.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        if keep_with_next:
+            fmt.keep_with_next = True
+
+    # --- 标题：保持原有版式 (仅段后 12pt) ---
+    fmt = doc.styles['ReportTitle'].paragraph_format
+    fmt.line_spacing = None
+    fmt.space_before = None
+    fmt.space_after = Pt(12)
+
+    # --- 悬挂缩进逻辑 (Strict Hanging Indent) ---
+    fmt = doc.styles['BulletHang'].paragraph_format
+    fmt.left_indent = Inches(0.25)
+    fmt.first_line_indent = Inches(-0.25)
+    fmt.tab_stops.add_tab_stop(Inches(0.25), WD_TAB_ALIGNMENT.LEFT)
+
+if __name__ == "__main__":
+    doc = Document()
+    add_report_styles(doc)
+    doc.save(TEMPLATE_PATH)
+    print(f"Saved {TEMPLATE_PATH}")